@@ -14,95 +14,280 @@ Pipeline: normalize → classify → allowlist → tier1 → tier2
 Exit behavior:
   - Exit 0 with deny JSON = block the command
   - Exit 0 with no output = allow the command
+
+A decision that takes longer than CLAUDE_GUARD_DEADLINE seconds (default 3)
+is abandoned and the command is put to the user as a Tier 2 prompt, so a
+pathological command can never outlast the hook timeout and run unchecked.
+
+With CLAUDE_GUARD_DAEMON=1 the decision is requested from a long-lived
+`command-guard.py --daemon` process (started on demand), falling back to
+in-process evaluation whenever the daemon is unavailable.
+
+`command-guard.py --serve` answers one hook input per stdin line with one
+response line (empty when allowed), so a test suite can drive many
+commands through a single interpreter.
 """
+import functools
+import json
+import math
 import os
+import signal
 import sys
+import time
 
 # Add scripts directory to path so guard package is importable
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from guard.protocol import read_input, deny, ask, format_tier1, format_tier2
-from guard.packs import load_all, allowlist_rules, tier1_rules, tier2_rules
-from guard.normalize import normalize
-from guard.classify import get_effective_command, check_execution_bridges
-from guard.explain import trace
+# Only the I/O and trace helpers are imported up front. The pipeline modules
+# load on the first decision, so input that needs none (empty, unparsable, or
+# a command the daemon answers) never pays for importing them.
+from guard.protocol import (
+    read_input, deny, ask, decision_output, format_tier1, format_tier2,
+)
+from guard.explain import trace, is_enabled
 
 
-def matches(pattern, *candidates: str) -> bool:
-    """Check if a pattern matches any of the candidate strings."""
-    return any(pattern.search(c) for c in candidates)
+def decide(command: str) -> tuple[str, str] | None:
+    """Run the guard pipeline on a command.
 
+    Returns ("deny", message) for Tier 1 and dangerous execution bridges,
+    ("ask", message) for Tier 2, or None when the command is allowed.
+    """
+    # Packs are imported by the match functions as commands need them
+    from guard.packs import match_allowlist, match_tier1, match_tier2
+    from guard.normalize import normalize
+    from guard.classify import get_effective_command, check_execution_bridges
 
-def main():
-    input_data = read_input()
-    if not input_data:
-        sys.exit(0)
-
-    tool_name = input_data.get("tool_name", "")
-    tool_input = input_data.get("tool_input") or {}
-    command = tool_input.get("command", "")
-
-    if tool_name != "Bash" or not isinstance(command, str) or not command:
-        sys.exit(0)
-
-    # Load all pattern packs
-    load_all()
-
-    trace("input", f"Command: {command}")
+    # Trace messages are only formatted in explain mode: a command can be
+    # large (heredocs, inline scripts) and is interpolated into several of
+    # them, which would be wasted work whenever tracing is off
+    explain = is_enabled()
+    if explain:
+        trace("input", f"Command: {command}")
 
     # Phase 1: Normalize
     normalized = normalize(command)
-    if normalized != command:
-        trace("normalize", f"Normalized: {normalized}")
-    else:
-        trace("normalize", "No changes")
+    if explain:
+        if normalized != command:
+            trace("normalize", f"Normalized: {normalized}")
+        else:
+            trace("normalize", "No changes")
 
     # Phase 2: Classify — check execution bridges first (separate from pattern matching)
     bridge_result = check_execution_bridges(command)
     if bridge_result:
         is_dangerous, reason = bridge_result
         if is_dangerous:
-            trace("bridge", f"Execution bridge detected: {reason}")
-            deny(format_tier1(reason, command))
-    else:
+            if explain:
+                trace("bridge", f"Execution bridge detected: {reason}")
+            return ("deny", format_tier1(reason, command))
+    elif explain:
         trace("bridge", "No execution bridges detected")
 
     # Phase 3: Build effective command (safe quoted strings and comments blanked)
     effective = get_effective_command(command)
-    effective_norm = get_effective_command(normalized)
-    if effective != command:
-        trace("classify", f"Effective command: {effective}")
+    if normalized != command:
+        effective_norm = get_effective_command(normalized)
+    else:
+        effective_norm = effective
+    if explain:
+        if effective != command:
+            trace("classify", f"Effective command: {effective}")
+        else:
+            trace("classify", "Effective command unchanged (no safe regions blanked)")
+
+    # Tiers are matched against both effective forms, but only once when
+    # normalization changed nothing the classifier kept
+    if effective_norm != effective:
+        haystacks = (effective, effective_norm)
     else:
-        trace("classify", "Effective command unchanged (no safe regions blanked)")
+        haystacks = (effective,)
 
     # Phase 4: Allowlist check — safe commands pass immediately
-    # Check all forms: original (for backward compat), normalized, and effective
-    for pattern in allowlist_rules():
-        if matches(pattern, command, normalized, effective, effective_norm):
+    # Check all forms: original (for backward compat), normalized, and effective.
+    # Usually several are identical, so each distinct string is searched once.
+    forms = dict.fromkeys((command, normalized, effective, effective_norm))
+    pattern = match_allowlist(*forms)
+    if pattern:
+        if explain:
             trace("allowlist", f"Matched allowlist pattern: {pattern.pattern}")
             trace("result", "ALLOW (allowlisted)")
-            sys.exit(0)
+        return None
 
     # Phase 5: Tier 1 — hard deny, catastrophic
     # Match against effective command (context-aware) to avoid false positives
     # on string literals and comments
-    for pattern, category, reason in tier1_rules():
-        if matches(pattern, effective, effective_norm):
+    rule = match_tier1(*haystacks)
+    if rule:
+        pattern, category, reason = rule
+        if explain:
             trace("tier 1", f"Matched [{category}]: {pattern.pattern}")
             trace("result", f"DENY (Tier 1): {reason}")
-            deny(format_tier1(reason, command))
+        return ("deny", format_tier1(reason, command))
 
     # Phase 6: Tier 2 — deny + redirect
-    for pattern, category, reason, alternative in tier2_rules():
-        if matches(pattern, effective, effective_norm):
+    rule = match_tier2(*haystacks)
+    if rule:
+        pattern, category, reason, alternative = rule
+        if explain:
             trace("tier 2", f"Matched [{category}]: {pattern.pattern}")
             trace("result", f"DENY (Tier 2): {reason}")
-            ask(format_tier2(reason, alternative, command))
+        return ("ask", format_tier2(reason, alternative, command))
 
     # Allow all other commands
-    trace("result", "ALLOW (no patterns matched)")
-    sys.exit(0)
+    if explain:
+        trace("result", "ALLOW (no patterns matched)")
+    return None
+
+
+# The pipeline is a pure function of the command string, so repeated
+# commands can skip it. Explain mode bypasses the cache so every call traces.
+_decide_cached = functools.lru_cache(maxsize=4096)(decide)
+
+
+# Seconds a decision may run before the command is escalated to the user.
+# Stays under the 5 s timeout in hooks.json: Claude Code skips a hook that
+# times out, which would let the command run unchecked.
+DEFAULT_DEADLINE = 3.0
+
+# Longest CLAUDE_GUARD_DEADLINE honoured. A larger value would let the host
+# kill the hook at its 5 s timeout before the alarm could ask the user.
+MAX_DEADLINE = 4.0
+
+
+class _DeadlineExceeded(Exception):
+    """Raised by the SIGALRM handler when a decision overruns its deadline."""
+
+
+def _deadline() -> float:
+    """Return the decision deadline in seconds (CLAUDE_GUARD_DEADLINE)."""
+    try:
+        seconds = float(os.environ.get("CLAUDE_GUARD_DEADLINE", ""))
+    except ValueError:
+        return DEFAULT_DEADLINE
+    if not math.isfinite(seconds) or seconds <= 0:
+        return DEFAULT_DEADLINE
+    return min(seconds, MAX_DEADLINE)
+
 
+def _overrun(command: str) -> tuple[str, str]:
+    """Return the Tier 2 prompt for a command not decided within the deadline."""
+    seconds = _deadline()
+    trace("result", f"ASK (not decided within {seconds:g}s)")
+    return ("ask", format_tier2(
+        f"claude-guard could not finish checking this command within {seconds:g} seconds.",
+        "Split it into smaller commands, or have the user review it before running.",
+        command,
+    ))
+
+
+def _bounded(decide_fn, command: str, seconds: float | None = None) -> tuple[str, str] | None:
+    """Run decide_fn(command), asking the user if it overruns the deadline.
+
+    seconds overrides the time allowed, for callers that have already spent
+    part of the deadline. The regex engine checks for signals while it
+    searches, so the alarm also interrupts a slow match. Without SIGALRM (or
+    off the main thread) the decision runs unbounded.
+    """
+    def expire(signum, frame):
+        raise _DeadlineExceeded
+
+    if seconds is None:
+        seconds = _deadline()
+    elif seconds <= 0:
+        return _overrun(command)
+    try:
+        previous = signal.signal(signal.SIGALRM, expire)
+    except (AttributeError, ValueError):
+        return decide_fn(command)
+    try:
+        try:
+            try:
+                signal.setitimer(signal.ITIMER_REAL, seconds)
+            except (OverflowError, ValueError, signal.ItimerError):
+                signal.setitimer(signal.ITIMER_REAL, DEFAULT_DEADLINE)
+            return decide_fn(command)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    except _DeadlineExceeded:
+        return _overrun(command)
+    finally:
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _decide_served(command: str) -> tuple[str, str] | None:
+    """Decision function used by the daemon."""
+    return _bounded(_decide_cached, command)
+
+
+def _decide_via_daemon(command: str) -> tuple[str, str] | None:
+    """Get a decision from the daemon, evaluating in-process if it cannot answer."""
+    from guard import daemon
+
+    started = time.monotonic()
+    decision = daemon.query(command)
+    if decision is daemon.MISS:
+        if not daemon.is_running():
+            daemon.spawn(os.path.abspath(__file__))
+        # Time spent on the daemon comes out of the deadline, so a slow or
+        # wedged daemon cannot push the hook past its timeout
+        remaining = _deadline() - (time.monotonic() - started)
+        decision = _bounded(_decide_cached, command, remaining)
+    return decision
+
+
+def respond(input_data: dict) -> tuple[str, str] | None:
+    """Return the decision for one PreToolUse input, or None to allow it."""
+    tool_name = input_data.get("tool_name", "")
+    tool_input = input_data.get("tool_input") or {}
+    command = tool_input.get("command", "")
+
+    if tool_name != "Bash" or not isinstance(command, str) or not command:
+        return None
+
+    if is_enabled():
+        return _bounded(decide, command)
+    if os.environ.get("CLAUDE_GUARD_DAEMON") == "1":
+        return _decide_via_daemon(command)
+    return _bounded(_decide_cached, command)
+
+
+def _serve_lines() -> None:
+    """Answer hook inputs on stdin, one JSON document per line (--serve)."""
+    for line in sys.stdin.buffer:
+        try:
+            input_data = json.loads(line)
+        except ValueError:
+            input_data = None
+        decision = respond(input_data) if isinstance(input_data, dict) else None
+        if decision:
+            sys.stdout.write(json.dumps(decision_output(*decision)))
+        sys.stdout.write("\n")
+        sys.stdout.flush()
+
+
+def main():
+    if "--daemon" in sys.argv[1:]:
+        from guard import daemon
+        daemon.serve(_decide_served)
+        sys.exit(0)
+
+    if "--serve" in sys.argv[1:]:
+        _serve_lines()
+        sys.exit(0)
+
+    input_data = read_input()
+    if not input_data:
+        sys.exit(0)
+
+    decision = respond(input_data)
+    if decision:
+        kind, message = decision
+        if kind == "deny":
+            deny(message)
+        ask(message)
+
+    sys.exit(0)
 
 if __name__ == "__main__":
     main()
@@ -11,47 +11,77 @@ Scans files after Write/Edit/MultiEdit operations for:
 Exit behavior:
   - Exit 0 with hookSpecificOutput JSON = add warning context
   - Exit 0 with no output = file is clean
+
+`credential-scanner.py --serve` answers one hook input per stdin line with one
+response line (empty when the file is clean), so a test suite can scan many
+files through a single interpreter.
 """
+import json
 import os
 import sys
 
 # Add scripts directory to path so guard package is importable
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from guard.protocol import read_input, warn
+from guard.protocol import read_input, warn, warning_output
 from guard.packs.credentials import scan_file
 
 
-def main():
-    input_data = read_input()
-    if not input_data:
-        sys.exit(0)
-
+def respond(input_data: dict) -> str | None:
+    """Return the warning for one PostToolUse input, or None if there is none."""
     tool_name = input_data.get("tool_name", "")
 
     # Only process file-writing tools
     if tool_name not in ("Write", "Edit", "MultiEdit"):
-        sys.exit(0)
+        return None
 
     tool_input = input_data.get("tool_input") or {}
     file_path = tool_input.get("file_path", "")
 
     if not file_path:
-        sys.exit(0)
+        return None
 
     warnings = scan_file(file_path)
+    if not warnings:
+        return None
 
-    if warnings:
-        warn_text = "\n".join(warnings)
-        warn(
-            f"CREDENTIAL/SAFETY WARNING in {file_path}:\n"
-            f"{warn_text}\n"
-            f"\nReview the file and ensure no secrets are committed. "
-            f"Use environment variables for sensitive values."
-        )
+    warn_text = "\n".join(warnings)
+    return (
+        f"CREDENTIAL/SAFETY WARNING in {file_path}:\n"
+        f"{warn_text}\n"
+        f"\nReview the file and ensure no secrets are committed. "
+        f"Use environment variables for sensitive values."
+    )
 
-    sys.exit(0)
 
+def _serve_lines() -> None:
+    """Answer hook inputs on stdin, one JSON document per line (--serve)."""
+    for line in sys.stdin.buffer:
+        try:
+            input_data = json.loads(line)
+        except ValueError:
+            input_data = None
+        context = respond(input_data) if isinstance(input_data, dict) else None
+        if context:
+            sys.stdout.write(json.dumps(warning_output(context)))
+        sys.stdout.write("\n")
+        sys.stdout.flush()
+
+
+def main():
+    if "--serve" in sys.argv[1:]:
+        _serve_lines()
+        sys.exit(0)
+
+    input_data = read_input()
+    if not input_data:
+        sys.exit(0)
+
+    context = respond(input_data)
+    if context:
+        warn(context)
+
+    sys.exit(0)
 
 if __name__ == "__main__":
     main()
@@ -1,33 +1,46 @@
 # ABOUTME: Context classification for shell commands.
 # ABOUTME: Distinguishes executed code from string literals, comments, and safe arguments.
+import bisect
+import functools
 import re
+import string
 
 # Variable assignment: VAR="value" — the quoted string is data, not code.
 _VAR_ASSIGNMENT = re.compile(r'[A-Za-z_][A-Za-z0-9_]*=$')
 
+# Characters that can appear in a variable name
+_NAME_CHARS = frozenset(string.ascii_letters + string.digits + "_")
+
+# Command separators that start a new segment. The lookahead finds every
+# occurrence, including overlapping ones such as the two in " && && ".
+_SEGMENT_SEPARATOR = re.compile(r'(?=( && | \|\| |; | \| ))')
+
+# A whitespace-delimited word
+_WORD = re.compile(r'\S+')
+
+# Quoted regions, scanned left to right: a single quote ends at the next
+# single quote (no escaping), a double quote at the next unescaped double
+# quote. Either may be unterminated.
+_QUOTED = re.compile(r"""'[^']*'?|"(?:[^"\\]+|\\[\s\S]?)*"?""")
+
 # Commands whose arguments are data, not code. Patterns in their quoted
 # arguments should not trigger the guard.
-_SAFE_WRAPPERS = {
+_SAFE_WRAPPERS = frozenset({
     "echo", "printf", "cat", "grep", "egrep", "fgrep", "rg", "ag",
     "sed", "awk", "head", "tail", "less", "more", "wc",
     "tee", "sort", "uniq", "cut", "tr", "xargs",
     "test", "[",
-}
+})
 
 # Flags whose arguments are data, not code. Quoted strings following
-# these flags are blanked before pattern matching.
-_DATA_FLAGS = {"-m", "--message", "--notes", "--body", "--title"}
+# these flags are blanked before pattern matching. A tuple, so one
+# str.endswith() call checks them all.
+_DATA_FLAGS = ("-m", "--message", "--notes", "--body", "--title")
 
-# Execution bridges: commands that execute their string argument as code
-_SHELL_BRIDGES = re.compile(
-    r'(?:^|&&|\|\||;)\s*'           # command start
-    r'(?:bash|sh|zsh|dash)\s+-c\s+'  # shell -c
-)
-
-_EVAL_BRIDGE = re.compile(
-    r'(?:^|&&|\|\||;)\s*'  # command start
-    r'eval\s+'             # eval
-)
+# Execution bridges: commands that execute their string argument as code.
+# Each check below is skipped when the command lacks text its pattern
+# requires. bash -c and eval need no pattern: their quoted arguments are
+# never blanked (see _SAFE_WRAPPERS), so the tiers see them as code.
 
 # Pipe-to-shell: output piped to a shell interpreter
 _PIPE_TO_SHELL = re.compile(
@@ -45,19 +58,20 @@ _INTERPRETER_BRIDGE = re.compile(
     r'(?:python3?|python2|ruby|perl|node)\s+(?:-c|-e)\s+'
 )
 
-# Language-specific destructive patterns (checked in bridge arguments)
-_LANG_DESTRUCTIVE = [
+# Language-specific destructive patterns (checked in bridge arguments),
+# searched as one alternation since any match makes the script destructive
+_LANG_DESTRUCTIVE = re.compile("|".join([
     # Python
-    re.compile(r'os\.remove|os\.unlink|os\.rmdir|shutil\.rmtree|shutil\.move'),
+    r'os\.remove|os\.unlink|os\.rmdir|shutil\.rmtree|shutil\.move',
     # Ruby
-    re.compile(r'FileUtils\.rm_rf|FileUtils\.rm_r|File\.delete|Dir\.rmdir'),
+    r'FileUtils\.rm_rf|FileUtils\.rm_r|File\.delete|Dir\.rmdir',
     # Perl
-    re.compile(r'unlink|rmdir|rmtree|File::Path'),
+    r'unlink|rmdir|rmtree|File::Path',
     # Node.js
-    re.compile(r'rmSync|rmdirSync|unlinkSync|rm\s*\(|rimraf'),
+    r'rmSync|rmdirSync|unlinkSync|rm\s*\(|rimraf',
     # PHP
-    re.compile(r'unlink|rmdir|array_map.*unlink'),
-]
+    r'unlink|rmdir|array_map.*unlink',
+]))
 
 
 def find_quoted_regions(command: str) -> list[tuple[int, int, str]]:
@@ -65,33 +79,9 @@ def find_quoted_regions(command: str) -> list[tuple[int, int, str]]:
 
     Returns list of (start, end, quote_char) tuples.
     Handles single quotes (no escaping) and double quotes (backslash escaping).
+    An unterminated quote runs to the end of the command.
     """
-    regions = []
-    i = 0
-    while i < len(command):
-        ch = command[i]
-        if ch == "'":
-            # Single quote: ends at next single quote, no escaping
-            end = command.find("'", i + 1)
-            if end == -1:
-                end = len(command)
-            regions.append((i, end + 1, "'"))
-            i = end + 1
-        elif ch == '"':
-            # Double quote: ends at next unescaped double quote
-            j = i + 1
-            while j < len(command):
-                if command[j] == '\\':
-                    j += 2
-                elif command[j] == '"':
-                    break
-                else:
-                    j += 1
-            regions.append((i, j + 1, '"'))
-            i = j + 1
-        else:
-            i += 1
-    return regions
+    return [(m.start(), m.end(), m.group()[0]) for m in _QUOTED.finditer(command)]
 
 
 def find_comment_start(command: str, quoted: list[tuple[int, int, str]]) -> int | None:
@@ -99,63 +89,69 @@ def find_comment_start(command: str, quoted: list[tuple[int, int, str]]) -> int
 
     Returns the index of # or None if no comment found.
     """
-    for i, ch in enumerate(command):
-        if ch == '#':
-            # Check if this # is inside any quoted region
-            in_quote = any(start <= i < end for start, end, _ in quoted)
-            if not in_quote:
-                return i
+    # Regions are sorted and disjoint, so only the last one starting at or
+    # before a # can contain it
+    starts = [start for start, _, _ in quoted]
+    i = command.find('#')
+    while i >= 0:
+        k = bisect.bisect_right(starts, i)
+        if k == 0 or quoted[k - 1][1] <= i:
+            return i
+        i = command.find('#', quoted[k - 1][1])
     return None
 
 
-def _preceding_word(command: str, pos: int) -> str:
-    """Get the word immediately before position pos, skipping whitespace."""
-    i = pos - 1
-    while i >= 0 and command[i] in ' \t':
-        i -= 1
-    end = i + 1
-    while i >= 0 and command[i] not in ' \t;|&':
-        i -= 1
-    return command[i + 1:end]
+def _segment_index(command: str) -> tuple[list[int], list[tuple[int, int]]]:
+    """Index where each command segment starts and the span of its first word.
 
-
-def _preceding_context(command: str, pos: int) -> str:
-    """Get the text before position pos for context analysis."""
-    return command[:pos].rstrip()
+    A segment starts at offset 0 and after every separator occurrence
+    (quotes are not considered). Segments without a word get an empty span
+    at the end of the command. Built once per command so checking each
+    quoted region does not rescan the text before it.
+    """
+    starts = sorted({0}.union(
+        m.start() + len(m.group(1)) for m in _SEGMENT_SEPARATOR.finditer(command)
+    ))
+    words = []
+    for start in starts:
+        word = _WORD.search(command, start)
+        words.append(word.span() if word else (len(command), len(command)))
+    return starts, words
 
 
-def is_safe_wrapper_arg(command: str, region_start: int) -> bool:
+def is_safe_wrapper_arg(command: str, region_start: int, segments=None) -> bool:
     """Check if a quoted region is an argument to a safe wrapper command.
 
     Looks at the command context before the quoted string to determine
     if it's an argument to echo, printf, grep, git commit -m, etc.
+    segments is the command's _segment_index(), computed if not given.
     """
-    preceding = _preceding_context(command, region_start)
+    # The context is everything before the region, minus trailing whitespace
+    end = region_start
+    while end > 0 and command[end - 1].isspace():
+        end -= 1
 
     # Check for data flags (-m, --message, --notes, --body, --title)
-    for flag in _DATA_FLAGS:
-        if preceding.endswith(flag):
-            return True
-
-    # Check for variable assignment: VAR="value"
-    if _VAR_ASSIGNMENT.search(preceding):
+    if command.endswith(_DATA_FLAGS, 0, end):
         return True
 
-    # Get the first word of the current command segment
-    # Split on command separators to find the current segment
-    segment_start = 0
-    for sep in [' && ', ' || ', '; ']:
-        last = preceding.rfind(sep)
-        if last >= 0:
-            segment_start = max(segment_start, last + len(sep))
-
-    # Also check pipe (but pipe to bash/sh is a bridge, handled elsewhere)
-    pipe_pos = preceding.rfind(' | ')
-    if pipe_pos >= 0:
-        segment_start = max(segment_start, pipe_pos + 3)
+    # Check for variable assignment: VAR="value". Only the run of name
+    # characters before the = can take part in a match.
+    if end and command[end - 1] == '=':
+        name_start = end - 1
+        while name_start > 0 and command[name_start - 1] in _NAME_CHARS:
+            name_start -= 1
+        if _VAR_ASSIGNMENT.search(command, name_start, end):
+            return True
 
-    segment = preceding[segment_start:].strip()
-    first_word = segment.split()[0] if segment.split() else ""
+    # Get the first word of the current command segment: the last segment
+    # whose separator (&&, ||, ;, or a pipe) ends within the context. Pipe
+    # to bash/sh is a bridge, handled elsewhere.
+    if segments is None:
+        segments = _segment_index(command)
+    starts, words = segments
+    word_start, word_end = words[bisect.bisect_right(starts, end) - 1]
+    first_word = command[word_start:min(word_end, end)]
 
     # Strip path prefix from first word
     if '/' in first_word:
@@ -164,6 +160,7 @@ def is_safe_wrapper_arg(command: str, region_start: int) -> bool:
     return first_word in _SAFE_WRAPPERS
 
 
+@functools.lru_cache(maxsize=2048)
 def get_effective_command(command: str) -> str:
     """Return command with safe quoted strings and comments replaced by spaces.
 
@@ -171,18 +168,23 @@ def get_effective_command(command: str) -> str:
     Safe quoted regions (echo args, grep patterns, git -m messages, etc.)
     are blanked out. Execution bridge arguments are preserved.
     """
+    # Without quotes or a # there is nothing that could be blanked
+    if "'" not in command and '"' not in command and '#' not in command:
+        return command
+
     quoted = find_quoted_regions(command)
     comment_start = find_comment_start(command, quoted)
 
     # Build list of regions to blank
     blank_regions = []
 
+    segments = _segment_index(command) if quoted else None
     for start, end, _ in quoted:
         # Skip quoted regions that are after a comment
         if comment_start is not None and start >= comment_start:
             continue
         # Only blank if this is an argument to a safe wrapper
-        if is_safe_wrapper_arg(command, start):
+        if is_safe_wrapper_arg(command, start, segments):
             blank_regions.append((start, end))
 
     # Blank comment region
@@ -192,14 +194,21 @@ def get_effective_command(command: str) -> str:
     if not blank_regions:
         return command
 
-    # Sort by start position and apply blanking
+    # Sort by start position and splice in one run of spaces per region,
+    # copying the text between regions as slices
     blank_regions.sort()
-    result = list(command)
+    parts = []
+    kept = 0
     for start, end in blank_regions:
-        for i in range(start, min(end, len(result))):
-            result[i] = ' '
+        start = max(start, kept)
+        end = min(end, len(command))
+        if end > start:
+            parts.append(command[kept:start])
+            parts.append(' ' * (end - start))
+            kept = end
+    parts.append(command[kept:])
 
-    return ''.join(result)
+    return ''.join(parts)
 
 
 def check_execution_bridges(command: str) -> tuple[bool, str] | None:
@@ -209,23 +218,24 @@ def check_execution_bridges(command: str) -> tuple[bool, str] | None:
     or None if no dangerous bridge detected.
     """
     # Pipe to shell: always dangerous (we can't know what's piped)
-    if _PIPE_TO_SHELL.search(command):
+    if '|' in command and _PIPE_TO_SHELL.search(command):
         return (True, "Piping output to a shell interpreter executes arbitrary code.")
 
     # Process substitution with download: shell <(curl/wget ...) executes remote code
-    if _PROCESS_SUB_DOWNLOAD.search(command):
+    if '<(' in command and _PROCESS_SUB_DOWNLOAD.search(command):
         return (True, "Process substitution with network download executes arbitrary remote code.")
 
+    if '-c' not in command and '-e' not in command:
+        return None
+
     # Check inline interpreters for language-specific destructive patterns
     for match in _INTERPRETER_BRIDGE.finditer(command):
         # Extract the argument (next quoted string or word)
         after = command[match.end():]
         arg = _extract_argument(after)
-        if arg:
-            for pattern in _LANG_DESTRUCTIVE:
-                if pattern.search(arg):
-                    return (True,
-                            f"Destructive operation detected in inline script: {arg[:60]}")
+        if arg and _LANG_DESTRUCTIVE.search(arg):
+            return (True,
+                    f"Destructive operation detected in inline script: {arg[:60]}")
 
     return None
 
@@ -0,0 +1,195 @@
+# ABOUTME: Optional long-lived decision server for the PreToolUse hook (CLAUDE_GUARD_DAEMON=1).
+# ABOUTME: Keeps packs loaded across commands; the hook falls back to in-process on any failure.
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+
+# Directory holding command-guard.py and the guard package
+_SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Daemon exits after this many seconds without a request
+IDLE_TIMEOUT = 30 * 60
+
+# Client-side limit, in total, for connecting to the daemon and reading its
+# reply. The hook's worst case is one query, one liveness check and the
+# in-process fallback, which gets only what is left of the decision deadline,
+# so all of it fits inside the 5 s hook timeout.
+CLIENT_TIMEOUT = 0.5
+
+# Returned by query() when no usable daemon answered
+MISS = object()
+
+
+def socket_path() -> str:
+    """Return the socket path for this copy of the scripts.
+
+    CLAUDE_GUARD_SOCKET overrides the location. Otherwise the name includes a
+    hash of the scripts directory so two installed plugin versions never
+    answer for each other.
+    """
+    override = os.environ.get("CLAUDE_GUARD_SOCKET")
+    if override:
+        return override
+    digest = hashlib.sha1(_SCRIPTS_DIR.encode()).hexdigest()[:12]
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(base, f"claude-guard-{os.getuid()}-{digest}.sock")
+
+
+def _fingerprint() -> tuple:
+    """Modification times of every script the daemon's decisions depend on."""
+    stamps = []
+    for dirpath, dirnames, filenames in os.walk(_SCRIPTS_DIR):
+        dirnames[:] = [d for d in dirnames if d != "__pycache__"]
+        for name in filenames:
+            if name.endswith(".py"):
+                path = os.path.join(dirpath, name)
+                stamps.append((path, os.stat(path).st_mtime_ns))
+    return tuple(sorted(stamps))
+
+
+def _recv_all(sock: socket.socket, deadline: float | None = None) -> bytes:
+    """Read from sock until the peer closes its write side.
+
+    With a deadline (a time.monotonic() value), a peer that trickles its
+    reply times out as a whole instead of once per recv.
+    """
+    chunks = []
+    while True:
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout("daemon reply too slow")
+            sock.settimeout(remaining)
+        chunk = sock.recv(65536)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+
+def query(command: str):
+    """Ask a running daemon for a decision.
+
+    Returns the decision (as decide() would) or MISS when no daemon owned by
+    this user answered with a well-formed reply.
+    """
+    path = socket_path()
+    deadline = time.monotonic() + CLIENT_TIMEOUT
+    try:
+        st = os.lstat(path)
+        if not stat.S_ISSOCK(st.st_mode) or st.st_uid != os.getuid():
+            return MISS
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CLIENT_TIMEOUT)
+            sock.connect(path)
+            sock.sendall(json.dumps({"command": command}).encode())
+            sock.shutdown(socket.SHUT_WR)
+            reply = json.loads(_recv_all(sock, deadline))
+    except (OSError, ValueError):
+        return MISS
+
+    if not isinstance(reply, dict) or "decision" not in reply:
+        return MISS
+    decision = reply["decision"]
+    if decision is None:
+        return None
+    if (isinstance(decision, list) and len(decision) == 2
+            and decision[0] in ("deny", "ask") and isinstance(decision[1], str)):
+        return (decision[0], decision[1])
+    return MISS
+
+
+def is_running() -> bool:
+    """Check whether something is accepting connections on the socket."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(CLIENT_TIMEOUT)
+        try:
+            sock.connect(socket_path())
+        except OSError:
+            return False
+    return True
+
+
+def spawn(script: str) -> None:
+    """Start `script --daemon` detached from the calling hook process."""
+    try:
+        subprocess.Popen(
+            [sys.executable, script, "--daemon"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError:
+        pass
+
+
+def serve(decide) -> None:
+    """Answer decide(command) over the socket until idle or sources change."""
+    path = socket_path()
+    if is_running():
+        return
+    try:
+        # Only ever replace a stale socket, never some other file
+        if not stat.S_ISSOCK(os.lstat(path).st_mode):
+            return
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+    fingerprint = _fingerprint()
+    state = {"last": time.monotonic(), "stop": False}
+
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            state["last"] = time.monotonic()
+            self.request.settimeout(CLIENT_TIMEOUT)
+            try:
+                request = json.loads(_recv_all(self.request))
+                command = request["command"]
+            except (OSError, ValueError, KeyError, TypeError):
+                return
+            if not isinstance(command, str):
+                return
+            try:
+                stale = _fingerprint() != fingerprint
+            except OSError:
+                stale = True
+            if stale:
+                # Rules changed on disk: refuse to answer so the hook
+                # evaluates in-process, and exit so a fresh daemon starts.
+                state["stop"] = True
+                reply = {"error": "stale"}
+            else:
+                reply = {"decision": decide(command)}
+            try:
+                self.request.sendall(json.dumps(reply).encode())
+            except OSError:
+                pass
+
+    old_umask = os.umask(0o177)
+    try:
+        server = socketserver.UnixStreamServer(path, Handler)
+    except OSError:
+        return
+    finally:
+        os.umask(old_umask)
+
+    server.timeout = 60
+    with server:
+        try:
+            while not state["stop"]:
+                server.handle_request()
+                if time.monotonic() - state["last"] > IDLE_TIMEOUT:
+                    break
+        finally:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
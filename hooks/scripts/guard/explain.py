@@ -3,18 +3,24 @@
 import os
 import sys
 
-_enabled = None
+# Read once at import. Explain mode is a per-process setting: the hook
+# never hands explain-mode commands to the daemon.
+_ENABLED = os.environ.get("CLAUDE_GUARD_EXPLAIN", "") == "1"
 
 
 def is_enabled() -> bool:
     """Check if explain mode is active (CLAUDE_GUARD_EXPLAIN=1)."""
-    global _enabled
-    if _enabled is None:
-        _enabled = os.environ.get("CLAUDE_GUARD_EXPLAIN", "") == "1"
-    return _enabled
+    return _ENABLED
 
 
-def trace(phase: str, message: str) -> None:
-    """Write a trace line to stderr if explain mode is enabled."""
-    if is_enabled():
-        print(f"[{phase}] {message}", file=sys.stderr)
+def _print_trace(phase: str, message: str) -> None:
+    """Write a trace line to stderr."""
+    print(f"[{phase}] {message}", file=sys.stderr)
+
+
+def _no_trace(phase: str, message: str) -> None:
+    """Discard a trace line (explain mode is off)."""
+
+
+# Bound once so a disabled trace is a bare call with no check
+trace = _print_trace if _ENABLED else _no_trace
@@ -1,5 +1,6 @@
 # ABOUTME: Command normalization for the PreToolUse pipeline.
 # ABOUTME: Strips path prefixes, collapses whitespace, handles env/git-config wrappers.
+import functools
 import re
 
 # Matches a leading absolute path to a binary (e.g., /usr/bin/git -> git)
@@ -15,6 +16,7 @@ _GIT_CONFIG = re.compile(r'^(git\s+)(-c\s+\S+\s+)+')
 _MULTI_WS = re.compile(r'[ \t]+')
 
 
+@functools.lru_cache(maxsize=2048)
 def normalize(command: str) -> str:
     """Normalize a shell command for pattern matching.
 
@@ -25,19 +27,26 @@ def normalize(command: str) -> str:
     4. Strip env VAR=val prefixes
     5. Strip git -c key=value config overrides
     """
+    # Each pass below only runs when its pattern could change the text:
+    # the literal it needs is a cheap substring check.
+
     # Strip leading/trailing whitespace
     cmd = command.strip()
 
-    # Collapse whitespace
-    cmd = _MULTI_WS.sub(' ', cmd)
+    # Collapse whitespace (a lone space already is collapsed)
+    if '\t' in cmd or '  ' in cmd:
+        cmd = _MULTI_WS.sub(' ', cmd)
 
     # Strip path prefixes from executables
-    cmd = _PATH_PREFIX.sub('', cmd)
+    if '/' in cmd:
+        cmd = _PATH_PREFIX.sub('', cmd)
 
     # Strip env prefix
-    cmd = _ENV_PREFIX.sub('', cmd)
+    if cmd.startswith('env'):
+        cmd = _ENV_PREFIX.sub('', cmd)
 
     # Strip git -c config overrides (git -c k=v push -> git push)
-    cmd = _GIT_CONFIG.sub(r'\1', cmd)
+    if cmd.startswith('git') and '-c' in cmd:
+        cmd = _GIT_CONFIG.sub(r'\1', cmd)
 
     return cmd
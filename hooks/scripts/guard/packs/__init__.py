@@ -1,53 +1,408 @@
 # ABOUTME: Pattern pack registry that collects rules from all domain packs.
 # ABOUTME: Each pack registers its patterns at import time via register().
+import importlib
 import re
+import sys
 
-# Tier 1: Hard deny — (compiled_regex, category, reason)
+from guard.regex_util import METACHARS, DeferredPattern, split_alternatives
+
+# Tier 1: Hard deny — (pattern, category, reason)
 _tier1 = []
 
-# Tier 2: Deny + redirect — (compiled_regex, category, reason, alternative)
+# Tier 2: Deny + redirect — (pattern, category, reason, alternative)
 _tier2 = []
 
-# Allowlist: Safe patterns — compiled regexes
+# Allowlist: Safe patterns (see DeferredPattern)
 _allowlist = []
 
+# Per-tier trigger index and combined alternations, built on first match
+# and reset on register
+_combined = {}
+
+# Combined alternations cached per tier, one per distinct rule subset
+_MAX_SUBSETS = 256
+
+# Packs in registration order, with the keywords that make them relevant.
+# core is always loaded; the others are imported the first time a command
+# contains one of their keywords (compared lowercased). Every rule in a pack
+# must require one of its keywords, which tests/test_packs.py checks.
+_PACKS = (
+    ("core", ()),
+    ("cloud", ("aws", "gcloud", "gsutil", "az")),
+    ("infra", ("terraform", "pulumi", "cdk")),
+    ("cicd", ("gh",)),
+    ("dns", ("aws", "gcloud", "az")),
+)
+
+# Rules registered by each pack as (tier1, tier2, allowlist) lists, keyed on
+# the pack name. Rules registered from outside the packs are kept under None
+# and merged last.
+_pack_rules = {}
+
+# Pack currently being imported by _load()
+_importing = None
+
+# Names of the packs imported so far
+_loaded = set()
+
+# True while registered rules have not yet been merged into the tier lists.
+# Checked before every match, so a merge cut short (e.g. by the hook's
+# deadline alarm) is redone instead of leaving a tier without a pack's rules.
+_unmerged = False
+
+# Leading global inline flags, e.g. (?i) — these must be scoped once joined
+_LEADING_FLAGS = re.compile(r'\(\?([aiLmsux]+)\)')
+
+# Quantifiers that make the preceding character optional
+_OPTIONAL = set("*?{")
+
+
+def _register(tier: int, rule, pack) -> None:
+    """Record a rule under its pack and refresh the tiers.
+
+    The pack is the one named by register_*(), else the one _load() is
+    importing. Packs name themselves, so a pack imported directly, outside
+    _load(), fills the same slot that a later _load() of it resets, rather
+    than leaving a second copy of its rules under None.
+    """
+    global _unmerged
+    if pack is None:
+        pack = _importing
+    elif pack not in (name for name, _ in _PACKS):
+        raise ValueError(f"unknown pack: {pack!r}")
+    _pack_rules.setdefault(pack, ([], [], []))[tier].append(rule)
+    _unmerged = True
+    if _importing is None:
+        _merge()
+
+
+def _merge() -> None:
+    """Rebuild the tier lists from every pack's rules in _PACKS order.
+
+    Keeping pack order fixed means ties between rules of different packs are
+    broken the same way whichever pack happened to be loaded first.
+    """
+    global _unmerged
+    _combined.clear()
+    order = [name for name, _ in _PACKS] + [None]
+    for tier, rules in enumerate((_tier1, _tier2, _allowlist)):
+        rules[:] = [
+            rule
+            for name in order if name in _pack_rules
+            for rule in _pack_rules[name][tier]
+        ]
+    _unmerged = False
 
-def register_tier1(pattern: str, category: str, reason: str) -> None:
+
+# Patterns never take a flags argument. Case-insensitive rules start with
+# an inline (?i), which the combined tier alternation rewrites as a scoped
+# (?i:...) group. Packs pass their own name as pack; rules registered
+# without one belong to the pack _load() is importing, if any.
+def register_tier1(
+    pattern: str, category: str, reason: str, pack: str = None
+) -> None:
     """Register a Tier 1 (hard deny) pattern."""
-    _tier1.append((re.compile(pattern), category, reason))
+    _register(0, (DeferredPattern(pattern), category, reason), pack)
 
 
 def register_tier2(
-    pattern: str, category: str, reason: str, alternative: str
+    pattern: str, category: str, reason: str, alternative: str,
+    pack: str = None,
 ) -> None:
     """Register a Tier 2 (deny + redirect) pattern."""
-    _tier2.append((re.compile(pattern), category, reason, alternative))
+    _register(
+        1, (DeferredPattern(pattern), category, reason, alternative), pack
+    )
 
 
-def register_allowlist(pattern: str) -> None:
+def register_allowlist(pattern: str, pack: str = None) -> None:
     """Register an allowlisted safe pattern."""
-    _allowlist.append(re.compile(pattern))
+    _register(2, DeferredPattern(pattern), pack)
 
 
 def tier1_rules():
-    """Return all registered Tier 1 rules."""
+    """Return the Tier 1 rules of the packs loaded so far (see load_all)."""
     return _tier1
 
 
 def tier2_rules():
-    """Return all registered Tier 2 rules."""
+    """Return the Tier 2 rules of the packs loaded so far (see load_all)."""
     return _tier2
 
 
 def allowlist_rules():
-    """Return all registered allowlist rules."""
+    """Return the allowlist rules of the packs loaded so far (see load_all)."""
     return _allowlist
 
 
+def _alternative(source: str) -> str:
+    """Wrap a pattern source so it can be joined with other patterns.
+
+    Leading global flags such as (?i) are rewritten as a scoped group so
+    they stay local to this pattern instead of leaking into its neighbours.
+    """
+    flags = _LEADING_FLAGS.match(source)
+    if flags:
+        return f"(?{flags.group(1)}:{source[flags.end():]})"
+    return f"(?:{source})"
+
+
+def _literal_chars(alternative: str) -> list[tuple[str, int]]:
+    """Return the literal characters every match of an alternative starts
+    with, each paired with the source offset just past it."""
+    literal = []
+    i = 0
+    while i < len(alternative):
+        ch = alternative[i]
+        if ch == '\\' and i + 1 < len(alternative) and not alternative[i + 1].isalnum():
+            # Escaped punctuation such as \. or \$ is a literal character
+            ch = alternative[i + 1]
+            i += 2
+        elif ch in METACHARS:
+            break
+        else:
+            i += 1
+        if i < len(alternative) and alternative[i] in _OPTIONAL:
+            break
+        literal.append((ch, i))
+    return literal
+
+
+def _literal_prefix(alternative: str) -> str:
+    """Return the literal text every match of an alternative starts with."""
+    return "".join(ch for ch, _ in _literal_chars(alternative))
+
+
+def _triggers(source: str) -> tuple[str, ...] | None:
+    """Return lowercase literals, one of which any match must contain.
+
+    Returns None when some alternative has no literal prefix, meaning the
+    pattern cannot be prefiltered and must always be searched.
+    """
+    flags = _LEADING_FLAGS.match(source)
+    if flags:
+        source = source[flags.end():]
+    literals = []
+    for alternative in split_alternatives(source):
+        literal = _literal_prefix(alternative)
+        if not literal:
+            return None
+        literals.append(literal.lower())
+    return tuple(dict.fromkeys(literals))
+
+
+def _index(patterns) -> tuple[dict[str, tuple[int, ...]], tuple[int, ...]]:
+    """Map each trigger literal to the rules that require it.
+
+    Rules without a literal prefix (see _triggers) are returned separately,
+    since they can never be ruled out and take part in every search.
+    """
+    by_literal = {}
+    always = []
+    for i, p in enumerate(patterns):
+        found = _triggers(p.pattern)
+        if found is None:
+            always.append(i)
+            continue
+        for literal in found:
+            by_literal.setdefault(literal, []).append(i)
+    return (
+        {literal: tuple(ids) for literal, ids in by_literal.items()},
+        tuple(always),
+    )
+
+
+def _grouped(source: str, name: str) -> str:
+    """Return a pattern source as a named group for a combined alternation.
+
+    Literal text that all of the pattern's alternatives start with is
+    placed in front of the group rather than inside it. sre can only skip
+    ahead to likely match positions when every branch of an alternation
+    starts with a literal, and it factors a prefix shared by all branches
+    (git, say) out into one literal search. With each rule's text inside
+    its group, every position of the command would be tried against
+    every rule.
+    """
+    group = f"(?P<{name}>{_alternative(source)})"
+    if _LEADING_FLAGS.match(source):
+        # A flag such as (?i) also applies to the leading literal
+        return group
+    alternatives = split_alternatives(source)
+    literals = []
+    for alternative in alternatives:
+        chars = _literal_chars(alternative)
+        if chars and alternative.startswith('+', chars[-1][1]):
+            # The last character is repeated, so it cannot move out
+            chars.pop()
+        literals.append(chars)
+    length = 0
+    while all(len(chars) > length for chars in literals) and len(
+            {chars[length][0] for chars in literals}) == 1:
+        length += 1
+    if not length:
+        return group
+    prefix = "".join(ch for ch, _ in literals[0][:length])
+    rest = "|".join(
+        alternative[chars[length - 1][1]:]
+        for alternative, chars in zip(alternatives, literals)
+    )
+    return f"{re.escape(prefix)}(?P<{name}>(?:{rest}))"
+
+
+def _combine(patterns) -> re.Pattern:
+    """Compile patterns into one alternation with a named group per rule."""
+    return re.compile("|".join(
+        _grouped(p.pattern, f"r{i}") for i, p in enumerate(patterns)
+    ))
+
+
+def _candidate_rules(entry: dict, candidate: str) -> tuple[int, ...]:
+    """Return, in registration order, the rules that could match candidate.
+
+    A rule is kept when the lowercased candidate contains one of its
+    literals, so case-sensitive and (?i) rules share one check. Non-ASCII
+    candidates keep every rule, since case-insensitive matching folds some
+    non-ASCII letters (e.g. U+017F) onto ASCII ones.
+    """
+    if not candidate.isascii():
+        return entry["all"]
+    lowered = candidate.lower()
+    ids = set(entry["always"])
+    for literal, rule_ids in entry["index"].items():
+        if literal in lowered:
+            ids.update(rule_ids)
+    return tuple(sorted(ids))
+
+
+def _subset_pattern(
+    entry: dict, ids: tuple[int, ...]
+) -> tuple[re.Pattern, tuple[int | None, ...]]:
+    """Return the combined alternation for a subset of a tier's rules.
+
+    Also returns a table from group number to rule index. Each rule's named
+    group encloses any groups of its own and so closes last, which makes
+    match.lastindex the number of the rule's group.
+    """
+    subsets = entry["subsets"]
+    found = subsets.get(ids)
+    if found is None:
+        if len(subsets) >= _MAX_SUBSETS:
+            subsets.clear()
+        patterns = entry["patterns"]
+        combined = _combine(patterns[i] for i in ids)
+        by_group = [None] * (combined.groups + 1)
+        for name, group in combined.groupindex.items():
+            by_group[group] = ids[int(name[1:])]
+        found = subsets[ids] = (combined, tuple(by_group))
+    return found
+
+
+def _first_match(name: str, rules: list, patterns, candidates):
+    """Return the rule whose pattern matches earliest in a candidate string.
+
+    Candidates are tried in order. For each one, only the rules whose
+    literals it contains are searched, as a single combined alternation;
+    a candidate containing none of the tier's literals costs no search at
+    all. When several rules match at the same position, the one registered
+    first wins.
+    """
+    if not rules:
+        return None
+    entry = _combined.get(name)
+    if entry is None:
+        patterns = list(patterns)
+        index, always = _index(patterns)
+        entry = _combined[name] = {
+            "patterns": patterns,
+            "index": index,
+            "always": always,
+            "all": tuple(range(len(patterns))),
+            "subsets": {},
+        }
+    for candidate in candidates:
+        ids = _candidate_rules(entry, candidate)
+        if not ids:
+            continue
+        combined, by_group = _subset_pattern(entry, ids)
+        m = combined.search(candidate)
+        if m:
+            return rules[by_group[m.lastindex]]
+    return None
+
+
+def match_tier1(*candidates: str):
+    """Return the Tier 1 rule matching any candidate, or None."""
+    _load_for(candidates)
+    return _first_match("tier1", _tier1, (r[0] for r in _tier1), candidates)
+
+
+def match_tier2(*candidates: str):
+    """Return the Tier 2 rule matching any candidate, or None."""
+    _load_for(candidates)
+    return _first_match("tier2", _tier2, (r[0] for r in _tier2), candidates)
+
+
+def match_allowlist(*candidates: str):
+    """Return the allowlist pattern matching any candidate, or None."""
+    _load_for(candidates)
+    return _first_match("allowlist", _allowlist, _allowlist, candidates)
+
+
+def _load(names) -> None:
+    """Import the named packs, in _PACKS order, and rebuild the tiers.
+
+    Each pack module is executed from scratch into an empty rule list, so a
+    pack only counts as loaded after one uninterrupted import. An earlier
+    attempt cut short (by an error or the hook's deadline alarm) may have
+    registered some rules or left the module cached half-registered.
+    """
+    global _importing, _unmerged
+    pending = [n for n, _ in _PACKS if n in names and n not in _loaded]
+    if not pending:
+        return
+    for name in pending:
+        module = f"{__name__}.{name}"
+        sys.modules.pop(module, None)
+        _pack_rules[name] = ([], [], [])
+        _unmerged = True
+        _importing = name
+        try:
+            importlib.import_module(module)
+        finally:
+            _importing = None
+        _loaded.add(name)
+    _merge()
+
+
+def _load_for(candidates) -> None:
+    """Import every pack whose rules could match one of the candidates.
+
+    A pack is needed when a lowercased candidate contains one of its
+    keywords. Non-ASCII candidates need every pack, since case-insensitive
+    matching folds some non-ASCII letters (e.g. U+017F) onto ASCII ones.
+    """
+    if _unmerged:
+        _merge()
+    if len(_loaded) == len(_PACKS):
+        return
+    lowered = [c.lower() for c in candidates]
+    everything = not all(c.isascii() for c in candidates)
+    needed = [
+        name for name, keywords in _PACKS
+        if name not in _loaded and (
+            everything or not keywords
+            or any(k in c for k in keywords for c in lowered)
+        )
+    ]
+    if needed:
+        _load(needed)
+
+
 def load_all():
-    """Import all pack modules to trigger registration."""
-    from guard.packs import core  # noqa: F401
-    from guard.packs import cloud  # noqa: F401
-    from guard.packs import infra  # noqa: F401
-    from guard.packs import cicd  # noqa: F401
-    from guard.packs import dns  # noqa: F401
+    """Import all pack modules to trigger registration.
+
+    Matching imports packs on demand, so this is only needed to list every
+    rule. Safe to call repeatedly: each pack is imported and its patterns
+    compiled once per process.
+    """
+    _load([name for name, _ in _PACKS])
@@ -1,6 +1,12 @@
 # ABOUTME: CI/CD patterns for GitHub CLI destructive operations.
 # ABOUTME: Blocks repo/release/secret deletion, allows creation and listing.
-from guard.packs import register_tier1, register_tier2
+from functools import partial
+
+from guard import packs
+
+# Rules are registered under this pack however the module is imported
+register_tier1 = partial(packs.register_tier1, pack="cicd")
+register_tier2 = partial(packs.register_tier2, pack="cicd")
 
 # =============================================================================
 # GitHub CLI (gh)
@@ -1,6 +1,13 @@
 # ABOUTME: Cloud provider CLI patterns for AWS, GCP, and Azure.
 # ABOUTME: Blocks destructive operations like instance termination, storage deletion, database drops.
-from guard.packs import register_tier1, register_tier2, register_allowlist
+from functools import partial
+
+from guard import packs
+
+# Rules are registered under this pack however the module is imported
+register_tier1 = partial(packs.register_tier1, pack="cloud")
+register_tier2 = partial(packs.register_tier2, pack="cloud")
+register_allowlist = partial(packs.register_allowlist, pack="cloud")
 
 # =============================================================================
 # AWS CLI
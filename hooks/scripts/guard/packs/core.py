@@ -1,31 +1,43 @@
 # ABOUTME: Core security patterns covering filesystem, git, disk, database, docker, kubernetes.
 # ABOUTME: Registers Tier 1 (hard deny), Tier 2 (deny+redirect), and allowlist patterns.
-from guard.packs import register_tier1, register_tier2, register_allowlist
+from functools import partial
+
+from guard import packs
+
+# Rules are registered under this pack however the module is imported
+register_tier1 = partial(packs.register_tier1, pack="core")
+register_tier2 = partial(packs.register_tier2, pack="core")
+register_allowlist = partial(packs.register_allowlist, pack="core")
 
 # =============================================================================
 # Tier 1: Hard Deny — catastrophic, irreversible operations
 # =============================================================================
 
+# rm with a combined flag word containing both r/R and f, in any order
+# (-rf, -fr, -Rf, -rfv, ...). The lookaheads check the flag letters without
+# enumerating every ordering.
+_RM_RF = r"rm\s+-(?=[a-zA-Z]*[rR])(?=[a-zA-Z]*f)[a-zA-Z]+\s+"
+
+
+def _through(literal: str) -> str:
+    """Match up to and including the first occurrence of literal.
+
+    Stands in for a leading `.*literal` in rules shaped `.*A.*B`: if any A
+    precedes a B, the first A does, so the rule matches the same commands.
+    Unlike `.*`, a failed search never retries later occurrences of A, so
+    these rules no longer take cubic time on long repetitive commands.
+    """
+    return rf"(?:(?!{literal}).)*{literal}"
+
 # Filesystem catastrophe
 register_tier1(
-    r"rm\s+-[a-zA-Z]*[rR][a-zA-Z]*f[a-zA-Z]*\s+/\s|"
-    r"rm\s+-[a-zA-Z]*f[a-zA-Z]*[rR][a-zA-Z]*\s+/\s|"
-    r"rm\s+-[a-zA-Z]*[rR][a-zA-Z]*f[a-zA-Z]*\s+/\*|"
-    r"rm\s+-[a-zA-Z]*f[a-zA-Z]*[rR][a-zA-Z]*\s+/\*|"
-    r"rm\s+-[a-zA-Z]*[rR][a-zA-Z]*f[a-zA-Z]*\s+/$",
+    _RM_RF + r"/(?:\s|\*|$)",
     "filesystem",
     "rm -rf on root filesystem is CATASTROPHIC. This will NOT be executed.",
 )
 
 register_tier1(
-    r"rm\s+-[a-zA-Z]*[rR][a-zA-Z]*f[a-zA-Z]*\s+~/?\s|"
-    r"rm\s+-[a-zA-Z]*f[a-zA-Z]*[rR][a-zA-Z]*\s+~/?\s|"
-    r"rm\s+-[a-zA-Z]*[rR][a-zA-Z]*f[a-zA-Z]*\s+~/?\*|"
-    r"rm\s+-[a-zA-Z]*f[a-zA-Z]*[rR][a-zA-Z]*\s+~/?\*|"
-    r"rm\s+-[a-zA-Z]*[rR][a-zA-Z]*f[a-zA-Z]*\s+~/?$|"
-    r"rm\s+-[a-zA-Z]*f[a-zA-Z]*[rR][a-zA-Z]*\s+~/?$|"
-    r'rm\s+-[a-zA-Z]*[rR][a-zA-Z]*f[a-zA-Z]*\s+\$HOME/?|'
-    r'rm\s+-[a-zA-Z]*f[a-zA-Z]*[rR][a-zA-Z]*\s+\$HOME/?',
+    _RM_RF + r"(?:~/?(?:\s|\*|$)|\$HOME)",
     "filesystem",
     "rm -rf on home directory is CATASTROPHIC. This will NOT be executed.",
 )
@@ -88,106 +100,61 @@ register_tier1(
 # Tier 2: Deny + Redirect — dangerous but has safer alternative
 # =============================================================================
 
-# Git force push
-register_tier2(
-    r"git\s+push\s+.*--force(?![-a-z])",
-    "git",
-    "Force push can destroy remote history.",
-    "Use --force-with-lease instead: it fails if someone else pushed.",
-)
-
-register_tier2(
-    r"git\s+push\s+.*-f\b",
-    "git",
-    "Force push (-f) can destroy remote history.",
-    "Use --force-with-lease instead: it fails if someone else pushed.",
-)
-
-# Git discard changes
-register_tier2(
-    r"git\s+reset\s+--hard",
-    "git",
-    "git reset --hard destroys uncommitted changes.",
-    "Use 'git stash' first to save changes, then reset.",
-)
-
-register_tier2(
-    r"git\s+reset\s+--merge",
-    "git",
-    "git reset --merge can lose uncommitted changes.",
-    "Use 'git stash' first to save changes, then reset.",
-)
-
-register_tier2(
-    r"git\s+checkout\s+--\s+\.",
-    "git",
-    "git checkout -- . discards all uncommitted changes.",
-    "Use 'git stash' to save changes, or 'git diff' to review first.",
-)
-
-register_tier2(
-    r"git\s+checkout\s+--\s+",
-    "git",
-    "git checkout -- <path> discards uncommitted changes to that path.",
-    "Use 'git stash' first, or 'git diff <path>' to review changes.",
-)
-
-register_tier2(
-    r"git\s+restore\s+(?!--staged\b)(?!-S\b)(?!.*--staged)",
-    "git",
-    "git restore discards uncommitted changes.",
-    "Use 'git restore --staged' to unstage, or 'git stash' to save changes.",
-)
-
-# Git clean
-register_tier2(
-    r"git\s+clean\s+-[a-z]*f",
-    "git",
-    "git clean -f removes untracked files permanently.",
-    "Run 'git clean -n' first (dry run) to see what would be removed.",
-)
-
-# Git branch force delete
-register_tier2(
-    r"git\s+branch\s+-D\b",
-    "git",
-    "git branch -D force-deletes without checking if the branch is merged.",
-    "Use 'git branch -d' instead: it only deletes if the branch is merged.",
-)
-
-# Git stash loss
-register_tier2(
-    r"git\s+stash\s+drop",
-    "git",
-    "git stash drop permanently deletes a stashed change.",
-    "Run 'git stash list' first to review what would be lost.",
-)
-
-register_tier2(
-    r"git\s+stash\s+clear",
-    "git",
-    "git stash clear permanently deletes ALL stashed changes.",
-    "Run 'git stash list' first to review what would be lost.",
-)
-
-# Pre-commit bypass
-register_tier2(
-    r"git\s+commit\s+.*--no-verify",
-    "git",
-    "Skipping pre-commit hooks bypasses safety checks.",
-    "Remove --no-verify and fix any hook failures instead.",
-)
-
-register_tier2(
-    r"git\s+push\s+.*--no-verify",
-    "git",
-    "Skipping pre-push hooks bypasses safety checks.",
-    "Remove --no-verify and fix any hook failures instead.",
-)
+# Git: (pattern, reason, alternative), registered in order under "git"
+_GIT_TIER2 = [
+    # Force push
+    (r"git\s+push\s+.*--force(?![-a-z])",
+     "Force push can destroy remote history.",
+     "Use --force-with-lease instead: it fails if someone else pushed."),
+    (r"git\s+push\s+.*-f\b",
+     "Force push (-f) can destroy remote history.",
+     "Use --force-with-lease instead: it fails if someone else pushed."),
+    # Discard changes
+    (r"git\s+reset\s+--hard",
+     "git reset --hard destroys uncommitted changes.",
+     "Use 'git stash' first to save changes, then reset."),
+    (r"git\s+reset\s+--merge",
+     "git reset --merge can lose uncommitted changes.",
+     "Use 'git stash' first to save changes, then reset."),
+    (r"git\s+checkout\s+--\s+\.",
+     "git checkout -- . discards all uncommitted changes.",
+     "Use 'git stash' to save changes, or 'git diff' to review first."),
+    (r"git\s+checkout\s+--\s+",
+     "git checkout -- <path> discards uncommitted changes to that path.",
+     "Use 'git stash' first, or 'git diff <path>' to review changes."),
+    (r"git\s+restore\s+(?!--staged\b)(?!-S\b)(?!.*--staged)",
+     "git restore discards uncommitted changes.",
+     "Use 'git restore --staged' to unstage, or 'git stash' to save changes."),
+    # Clean
+    (r"git\s+clean\s+-[a-z]*f",
+     "git clean -f removes untracked files permanently.",
+     "Run 'git clean -n' first (dry run) to see what would be removed."),
+    # Branch force delete
+    (r"git\s+branch\s+-D\b",
+     "git branch -D force-deletes without checking if the branch is merged.",
+     "Use 'git branch -d' instead: it only deletes if the branch is merged."),
+    # Stash loss
+    (r"git\s+stash\s+drop",
+     "git stash drop permanently deletes a stashed change.",
+     "Run 'git stash list' first to review what would be lost."),
+    (r"git\s+stash\s+clear",
+     "git stash clear permanently deletes ALL stashed changes.",
+     "Run 'git stash list' first to review what would be lost."),
+    # Hook bypass
+    (r"git\s+commit\s+.*--no-verify",
+     "Skipping pre-commit hooks bypasses safety checks.",
+     "Remove --no-verify and fix any hook failures instead."),
+    (r"git\s+push\s+.*--no-verify",
+     "Skipping pre-push hooks bypasses safety checks.",
+     "Remove --no-verify and fix any hook failures instead."),
+]
+
+for _pattern, _reason, _alternative in _GIT_TIER2:
+    register_tier2(_pattern, "git", _reason, _alternative)
 
 # Recursive delete (non-root, non-tmp — caught after Tier 1 and allowlist)
 register_tier2(
-    r"rm\s+-[a-zA-Z]*[rR][a-zA-Z]*f|rm\s+-[a-zA-Z]*f[a-zA-Z]*[rR]",
+    r"rm\s+-(?=[a-zA-Z]*[rR])(?=[a-zA-Z]*f)",
     "filesystem",
     "rm -rf is destructive and irreversible.",
     "List the directory contents first, then ask the user to confirm deletion.",
@@ -204,54 +171,37 @@ register_tier2(
 
 # Long-form rm options
 register_tier2(
-    r"rm\s+.*--recursive.*--force|rm\s+.*--force.*--recursive",
+    r"rm\s+" + _through("--recursive") + r".*--force|"
+    r"rm\s+" + _through("--force") + r".*--recursive",
     "filesystem",
     "rm --recursive --force is destructive.",
     "List the directory contents first, then ask the user to confirm deletion.",
 )
 
-# Docker destructive operations
-register_tier2(
-    r"docker\s+system\s+prune",
-    "docker",
-    "docker system prune removes unused containers, networks, images, and optionally volumes.",
-    "Run 'docker system prune --dry-run' first to see what would be removed.",
-)
-
-register_tier2(
-    r"docker\s+rm\s+-f|docker\s+rm\s+--force",
-    "docker",
-    "docker rm -f force-removes running containers.",
-    "Use 'docker stop' first, then 'docker rm' without --force.",
-)
-
-register_tier2(
-    r"docker\s+volume\s+rm",
-    "docker",
-    "docker volume rm permanently deletes volume data.",
-    "Run 'docker volume ls' first to review, and confirm with the user.",
-)
-
-register_tier2(
-    r"docker\s+network\s+rm",
-    "docker",
-    "docker network rm removes a network and disconnects containers.",
-    "Run 'docker network ls' first to review, and confirm with the user.",
-)
-
-register_tier2(
-    r"docker\s+compose\s+down\s+.*-v|docker-compose\s+down\s+.*-v",
-    "docker",
-    "docker compose down -v destroys all named volumes.",
-    "Use 'docker compose down' without -v to preserve volume data.",
-)
-
-register_tier2(
-    r"docker\s+rmi\s+-f|docker\s+rmi\s+--force",
-    "docker",
-    "docker rmi -f force-removes images even if containers use them.",
-    "Use 'docker rmi' without --force for safe removal.",
-)
+# Docker: (pattern, reason, alternative), registered in order under "docker"
+_DOCKER_TIER2 = [
+    (r"docker\s+system\s+prune",
+     "docker system prune removes unused containers, networks, images, and optionally volumes.",
+     "Run 'docker system prune --dry-run' first to see what would be removed."),
+    (r"docker\s+rm\s+-f|docker\s+rm\s+--force",
+     "docker rm -f force-removes running containers.",
+     "Use 'docker stop' first, then 'docker rm' without --force."),
+    (r"docker\s+volume\s+rm",
+     "docker volume rm permanently deletes volume data.",
+     "Run 'docker volume ls' first to review, and confirm with the user."),
+    (r"docker\s+network\s+rm",
+     "docker network rm removes a network and disconnects containers.",
+     "Run 'docker network ls' first to review, and confirm with the user."),
+    (r"docker\s+compose\s+down\s+.*-v|docker-compose\s+down\s+.*-v",
+     "docker compose down -v destroys all named volumes.",
+     "Use 'docker compose down' without -v to preserve volume data."),
+    (r"docker\s+rmi\s+-f|docker\s+rmi\s+--force",
+     "docker rmi -f force-removes images even if containers use them.",
+     "Use 'docker rmi' without --force for safe removal."),
+]
+
+for _pattern, _reason, _alternative in _DOCKER_TIER2:
+    register_tier2(_pattern, "docker", _reason, _alternative)
 
 # Destructive move to /dev/null
 register_tier2(
@@ -314,28 +264,13 @@ register_allowlist(r"git\s+push\s+.*--force-with-lease")
 register_allowlist(r"git\s+push\s+.*--force-if-includes")
 
 # rm -rf on temp directories
-register_allowlist(r"rm\s+-[a-zA-Z]*[rR][a-zA-Z]*f[a-zA-Z]*\s+/tmp/")
-register_allowlist(r"rm\s+-[a-zA-Z]*f[a-zA-Z]*[rR][a-zA-Z]*\s+/tmp/")
-register_allowlist(r"rm\s+-[a-zA-Z]*[rR][a-zA-Z]*f[a-zA-Z]*\s+/var/tmp/")
-register_allowlist(r"rm\s+-[a-zA-Z]*f[a-zA-Z]*[rR][a-zA-Z]*\s+/var/tmp/")
-register_allowlist(r"rm\s+-[a-zA-Z]*[rR][a-zA-Z]*f[a-zA-Z]*\s+\$TMPDIR/")
-register_allowlist(r"rm\s+-[a-zA-Z]*f[a-zA-Z]*[rR][a-zA-Z]*\s+\$TMPDIR/")
-register_allowlist(r"rm\s+-[a-zA-Z]*[rR][a-zA-Z]*f[a-zA-Z]*\s+\$\{TMPDIR")
-register_allowlist(r"rm\s+-[a-zA-Z]*f[a-zA-Z]*[rR][a-zA-Z]*\s+\$\{TMPDIR")
-register_allowlist(r'rm\s+-[a-zA-Z]*[rR][a-zA-Z]*f[a-zA-Z]*\s+"\$TMPDIR/')
-register_allowlist(r'rm\s+-[a-zA-Z]*f[a-zA-Z]*[rR][a-zA-Z]*\s+"\$TMPDIR/')
-register_allowlist(r'rm\s+-[a-zA-Z]*[rR][a-zA-Z]*f[a-zA-Z]*\s+"\$\{TMPDIR')
-register_allowlist(r'rm\s+-[a-zA-Z]*f[a-zA-Z]*[rR][a-zA-Z]*\s+"\$\{TMPDIR')
+register_allowlist(_RM_RF + r'(?:/tmp/|/var/tmp/|"?\$TMPDIR/|"?\$\{TMPDIR)')
 
 # Separate flags on temp directories
-register_allowlist(r"rm\s+(-[a-zA-Z]+\s+)*-[rR]\s+(-[a-zA-Z]+\s+)*-f\s+/tmp/")
-register_allowlist(r"rm\s+(-[a-zA-Z]+\s+)*-f\s+(-[a-zA-Z]+\s+)*-[rR]\s+/tmp/")
-register_allowlist(r"rm\s+(-[a-zA-Z]+\s+)*-[rR]\s+(-[a-zA-Z]+\s+)*-f\s+/var/tmp/")
-register_allowlist(r"rm\s+(-[a-zA-Z]+\s+)*-f\s+(-[a-zA-Z]+\s+)*-[rR]\s+/var/tmp/")
-register_allowlist(r"rm\s+.*--recursive.*--force\s+/tmp/")
-register_allowlist(r"rm\s+.*--force.*--recursive\s+/tmp/")
-register_allowlist(r"rm\s+.*--recursive.*--force\s+/var/tmp/")
-register_allowlist(r"rm\s+.*--force.*--recursive\s+/var/tmp/")
+register_allowlist(r"rm\s+(-[a-zA-Z]+\s+)*-[rR]\s+(-[a-zA-Z]+\s+)*-f\s+(?:/tmp/|/var/tmp/)")
+register_allowlist(r"rm\s+(-[a-zA-Z]+\s+)*-f\s+(-[a-zA-Z]+\s+)*-[rR]\s+(?:/tmp/|/var/tmp/)")
+register_allowlist(r"rm\s+" + _through("--recursive") + r".*--force\s+(?:/tmp/|/var/tmp/)")
+register_allowlist(r"rm\s+" + _through("--force") + r".*--recursive\s+(?:/tmp/|/var/tmp/)")
 
 # Docker dry runs
 register_allowlist(r"docker\s+system\s+prune\s+.*--dry-run")
@@ -344,5 +279,5 @@ register_allowlist(r"docker\s+system\s+prune\s+.*--dry-run")
 register_allowlist(r"kubectl\s+delete\s+.*--dry-run")
 
 # Database safe patterns (case-insensitive: SQL keywords vary in case)
-register_allowlist(r"(?i)DROP\s+TABLE\s+IF\s+EXISTS.*--.*test")
+register_allowlist(r"(?i)DROP\s+TABLE\s+IF\s+EXISTS" + _through("--") + r".*test")
 register_allowlist(r"(?i)CREATE\s+(?:OR\s+REPLACE\s+)?(?:TABLE|VIEW|INDEX)\s+.*DROP\s+(?:TABLE|VIEW|INDEX)\s+IF\s+EXISTS")
@@ -1,71 +1,99 @@
 # ABOUTME: Credential and secret detection patterns for file scanning.
 # ABOUTME: Covers AWS, API keys, tokens, private keys, connection strings, JWT, Stripe, Google.
+import functools
+import mmap
+import os
 import re
 
-# Credential patterns: (compiled_regex, label, env_var_suppressed)
+from guard.regex_util import METACHARS, DeferredPattern, split_alternatives
+
+# Patterns are bytes regexes: files are scanned as raw bytes (see scan_file),
+# so \s, \w and (?i) use ASCII semantics. Each is compiled only when a file
+# first needs it searched, which most writes never do for most patterns.
+
+# Credential patterns: (regex, label, env_var_suppressed, keywords)
 # When env_var_suppressed is True, the match is skipped if the file also contains
 # environment variable references (process.env, os.environ, ${VAR}, etc.)
+# Every match contains one of the keywords (compared lowercased), so files
+# without any skip that pattern's search.
 CREDENTIAL_PATTERNS = [
-    (re.compile(r'AKIA[0-9A-Z]{16}'),
-     "AWS Access Key ID", False),
+    (DeferredPattern(rb'AKIA[0-9A-Z]{16}'),
+     "AWS Access Key ID", False, (b"akia",)),
 
-    (re.compile(r'aws_secret_access_key\s*[=:]\s*[A-Za-z0-9/+=]{40}'),
-     "AWS Secret Access Key", False),
+    (DeferredPattern(rb'aws_secret_access_key\s*[=:]\s*[A-Za-z0-9/+=]{40}'),
+     "AWS Secret Access Key", False, (b"aws_secret_access_key",)),
 
-    (re.compile(r'(?i)(api[_-]?key|apikey)\s*[=:]\s*["\']?[A-Za-z0-9+/=_-]{20,}'),
-     "Potential API key", False),
+    (DeferredPattern(rb'(?i)(api[_-]?key|apikey)\s*[=:]\s*["\']?[A-Za-z0-9+/=_-]{20,}'),
+     "Potential API key", False, (b"api",)),
 
-    (re.compile(r'(?i)(secret|token|password|credential)\s*[=:]\s*["\'][^"\']{8,}'),
-     "Potential secret/token/password hardcoded", True),
+    (DeferredPattern(rb'(?i)(secret|token|password|credential)\s*[=:]\s*["\'][^"\']{8,}'),
+     "Potential secret/token/password hardcoded", True,
+     (b"secret", b"token", b"password", b"credential")),
 
-    (re.compile(r'PRIVATE KEY-----'),
-     "Private key", False),
+    (DeferredPattern(rb'PRIVATE KEY-----'),
+     "Private key", False, (b"private key-----",)),
 
-    (re.compile(r'(ghp_|gho_|ghu_|ghs_|ghr_)[A-Za-z0-9]{20,}'),
-     "GitHub token", False),
+    (DeferredPattern(rb'(ghp_|gho_|ghu_|ghs_|ghr_)[A-Za-z0-9]{20,}'),
+     "GitHub token", False, (b"ghp_", b"gho_", b"ghu_", b"ghs_", b"ghr_")),
 
-    (re.compile(r'glpat-[A-Za-z0-9_-]{20,}'),
-     "GitLab token", False),
+    (DeferredPattern(rb'glpat-[A-Za-z0-9_-]{20,}'),
+     "GitLab token", False, (b"glpat-",)),
 
-    (re.compile(r'xox[baprs]-[0-9]{10,}'),
-     "Slack token", False),
+    (DeferredPattern(rb'xox[baprs]-[0-9]{10,}'),
+     "Slack token", False, (b"xox",)),
 
-    (re.compile(r'(?i)(postgresql|mysql|mongodb|redis|amqp)://[^:]+:[^@]+@'),
-     "Database connection string with embedded credentials", True),
+    (DeferredPattern(rb'(?i)(postgresql|mysql|mongodb|redis|amqp)://[^:]+:[^@]+@'),
+     "Database connection string with embedded credentials", True, (b"://",)),
 
-    (re.compile(r'eyJ[A-Za-z0-9_-]*\.eyJ[A-Za-z0-9_-]*\.[A-Za-z0-9_-]'),
-     "JWT token", False),
+    (DeferredPattern(rb'eyJ[A-Za-z0-9_-]*\.eyJ[A-Za-z0-9_-]*\.[A-Za-z0-9_-]'),
+     "JWT token", False, (b"eyj",)),
 
-    (re.compile(r'AIza[0-9A-Za-z_-]{35}'),
-     "Google API key", False),
+    (DeferredPattern(rb'AIza[0-9A-Za-z_-]{35}'),
+     "Google API key", False, (b"aiza",)),
 
-    (re.compile(r'(sk_live_|pk_live_|sk_test_|rk_live_)[A-Za-z0-9]{20,}'),
-     "Stripe API key", False),
+    (DeferredPattern(rb'(sk_live_|pk_live_|sk_test_|rk_live_)[A-Za-z0-9]{20,}'),
+     "Stripe API key", False, (b"sk_live_", b"pk_live_", b"sk_test_", b"rk_live_")),
 ]
 
 # Environment variable reference patterns used for false positive suppression
-ENV_VAR_PATTERN = re.compile(
-    r'process\.env|os\.environ|\$\{|getenv|ENV\[|var\('
+ENV_VAR_PATTERN = DeferredPattern(
+    rb'process\.env|os\.environ|\$\{|getenv|ENV\[|var\('
 )
 
-# SQL patterns: (compiled_regex, label)
+# SQL patterns: (compiled_regex, label, keywords), keywords as for
+# CREDENTIAL_PATTERNS
 SQL_PATTERNS = [
-    (re.compile(r'(?i)DROP\s+(TABLE|DATABASE|SCHEMA|INDEX)'),
-     "Destructive SQL (DROP) found in file — verify this is intentional"),
+    (DeferredPattern(rb'(?i)DROP\s+(TABLE|DATABASE|SCHEMA|INDEX)'),
+     "Destructive SQL (DROP) found in file — verify this is intentional",
+     (b"drop",)),
 
-    (re.compile(r'(?i)TRUNCATE\s+'),
-     "Destructive SQL (TRUNCATE) found in file — verify this is intentional"),
+    (DeferredPattern(rb'(?i)TRUNCATE\s+'),
+     "Destructive SQL (TRUNCATE) found in file — verify this is intentional",
+     (b"truncate",)),
 ]
 
 # DELETE without WHERE is a special case — need to check both patterns
-SQL_DELETE_PATTERN = re.compile(r'(?i)DELETE\s+FROM\s+\w+\s*;')
-SQL_DELETE_WITH_WHERE = re.compile(r'(?i)DELETE\s+FROM\s+\w+\s+WHERE')
+SQL_DELETE_PATTERN = DeferredPattern(rb'(?i)DELETE\s+FROM\s+\w+\s*;')
+SQL_DELETE_WITH_WHERE = DeferredPattern(rb'(?i)DELETE\s+FROM\s+\w+\s+WHERE')
+SQL_DELETE_KEYWORDS = (b"delete",)
 
 # File extensions where SQL scanning applies
 SQL_EXTENSIONS = {
     ".sql", ".py", ".js", ".ts", ".rb", ".go", ".java", ".php", ".sh", ".bash"
 }
 
+# Largest file given a lowercased copy (see scan_file)
+LOWERED_MAX_BYTES = 16 * 1024 * 1024
+
+# Every keyword above, and the slice of a larger file lowercased at a time to
+# look for them
+_KEYWORDS = frozenset(
+    [keyword for *_, keywords in CREDENTIAL_PATTERNS for keyword in keywords]
+    + [keyword for *_, keywords in SQL_PATTERNS for keyword in keywords]
+    + list(SQL_DELETE_KEYWORDS)
+)
+_KEYWORD_CHUNK = 1024 * 1024
+
 # File paths that should be skipped entirely
 SKIP_PATTERNS = [
     "/.git/",
@@ -82,18 +110,26 @@ SKIP_PATTERNS = [
 ]
 
 
+# SKIP_PATTERNS without the leading slash, also skipped as path suffixes
+# (a bare "yarn.lock" passed as a relative path)
+_SKIP_SUFFIXES = tuple(pattern.lstrip("/") for pattern in SKIP_PATTERNS)
+
+
 def should_skip(file_path: str) -> bool:
     """Check if the file should be skipped based on path patterns."""
-    for pattern in SKIP_PATTERNS:
-        if pattern in file_path or file_path.endswith(pattern.lstrip("/")):
-            return True
-    return False
+    return file_path.endswith(_SKIP_SUFFIXES) or any(
+        pattern in file_path for pattern in SKIP_PATTERNS
+    )
 
 
 def scan_file(file_path: str) -> list[str]:
-    """Scan a file for credentials and destructive SQL. Returns list of warnings."""
-    import os
+    """Scan a file for credentials and destructive SQL. Returns list of warnings.
 
+    The file is memory-mapped and searched as bytes, so it is never decoded
+    into a str; filesystems that cannot map files are read instead. Files up
+    to LOWERED_MAX_BYTES are also copied once, lowercased, for the keyword
+    checks and folded searches; larger ones are only searched in place.
+    """
     if should_skip(file_path):
         return []
 
@@ -101,31 +137,139 @@ def scan_file(file_path: str) -> list[str]:
         return []
 
     try:
-        with open(file_path, "r", errors="ignore") as f:
-            content = f.read()
+        with open(file_path, "rb") as f:
+            try:
+                content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped, and hold nothing to find
+                return []
+            except OSError:
+                content = f.read()
     except OSError:
         return []
 
+    try:
+        return _scan_content(content, file_path)
+    finally:
+        if isinstance(content, mmap.mmap):
+            content.close()
+
+
+def _scan_content(content, file_path: str) -> list[str]:
+    """Return the warnings for a file's raw bytes."""
     warnings = []
-    has_env_vars = bool(ENV_VAR_PATTERN.search(content))
+    # Searched for only once a pattern that it suppresses has matched
+    has_env_vars = None
+
+    # One lowercased copy serves the folded searches below, unless the file
+    # is too large to duplicate in memory
+    if len(content) <= LOWERED_MAX_BYTES:
+        lowered = content[:].lower()
+    else:
+        lowered = None
+    found = _found_keywords(content, lowered)
 
     # Credential patterns
-    for pattern, label, env_suppressed in CREDENTIAL_PATTERNS:
-        if pattern.search(content):
-            if env_suppressed and has_env_vars:
-                continue
+    for pattern, label, env_suppressed, keywords in CREDENTIAL_PATTERNS:
+        if found.isdisjoint(keywords):
+            continue
+        if _search(pattern, content, lowered):
+            if env_suppressed:
+                if has_env_vars is None:
+                    has_env_vars = bool(ENV_VAR_PATTERN.search(content))
+                if has_env_vars:
+                    continue
             warnings.append(f"- {label} detected")
 
     # SQL patterns (only for relevant file extensions)
     _, ext = os.path.splitext(file_path)
     if ext.lower() in SQL_EXTENSIONS:
-        for pattern, label in SQL_PATTERNS:
-            if pattern.search(content):
+        for pattern, label, keywords in SQL_PATTERNS:
+            if not found.isdisjoint(keywords) and _search(pattern, content, lowered):
                 warnings.append(f"- {label}")
 
         # Special DELETE without WHERE check
-        if SQL_DELETE_PATTERN.search(content):
-            if not SQL_DELETE_WITH_WHERE.search(content):
+        if (not found.isdisjoint(SQL_DELETE_KEYWORDS)
+                and _search(SQL_DELETE_PATTERN, content, lowered)):
+            if not _search(SQL_DELETE_WITH_WHERE, content, lowered):
                 warnings.append("- DELETE FROM without WHERE clause found in file")
 
     return warnings
+
+
+def _found_keywords(content, lowered: bytes | None) -> set[bytes]:
+    """Return the pattern keywords that occur in the content, ignoring case.
+
+    A few dozen substring searches cost far less than the regex passes, most
+    of them case-insensitive, that they let clean files skip. Without a
+    lowercased copy the content is lowercased a chunk at a time, each chunk
+    overlapping the last by enough to catch a keyword split between them.
+    """
+    if lowered is not None:
+        return {keyword for keyword in _KEYWORDS if keyword in lowered}
+    found = set()
+    overlap = max(map(len, _KEYWORDS)) - 1
+    for start in range(0, len(content), _KEYWORD_CHUNK):
+        chunk = content[max(start - overlap, 0):start + _KEYWORD_CHUNK].lower()
+        found.update(keyword for keyword in _KEYWORDS if keyword in chunk)
+    return found
+
+
+def _search(pattern, content, lowered: bytes | None) -> bool:
+    """Check whether a pattern matches a file's content.
+
+    (?i) patterns are run over the lowercased copy in their case-sensitive
+    form (see _folded), where sre can scan for their leading literals
+    instead of folding every byte.
+    """
+    folded = _folded(pattern) if lowered is not None else None
+    if folded is not None:
+        pattern, content = folded, lowered
+    end = len(content)
+    final = _final_literal(pattern)
+    if final is not None:
+        # Every match ends with this byte, so none extends past its last
+        # occurrence. Without the bound, a file full of unterminated
+        # "redis://" prefixes costs a scan to the end of the file for each.
+        end = content.rfind(final) + 1
+    return pattern.search(content, 0, end) is not None
+
+
+# Escapes whose meaning changes when lowercased (\S, \W, \D, \B, ...)
+_UPPERCASE_ESCAPE = re.compile(rb'\\[A-Z]')
+
+
+@functools.lru_cache(maxsize=None)
+def _folded(pattern):
+    """Return the case-sensitive form of a leading-(?i) bytes pattern.
+
+    Bytes patterns fold ASCII letters only, exactly as bytes.lower() does,
+    so dropping (?i) and lowercasing the source gives a pattern that
+    matches lowercased content wherever the original matches the content.
+    Returns None for patterns without (?i) or that cannot be folded.
+    """
+    source = pattern.pattern
+    if not source.startswith(b"(?i)") or _UPPERCASE_ESCAPE.search(source):
+        return None
+    try:
+        return re.compile(source[4:].lower())
+    except re.error:
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def _final_literal(pattern):
+    """Return the non-letter byte every match of a pattern ends with.
+
+    Returns None when the pattern has top-level alternatives, lookaheads
+    that could look past the end of a match, or ends in anything but a plain
+    literal.
+    """
+    source = pattern.pattern.decode("latin-1")
+    if (pattern.flags & re.VERBOSE or "(?=" in source or "(?!" in source
+            or len(split_alternatives(source)) != 1):
+        return None
+    final = source[-1:]
+    if not final or final.isalnum() or final in METACHARS:
+        return None
+    return final.encode("latin-1")
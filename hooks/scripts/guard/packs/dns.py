@@ -1,6 +1,12 @@
 # ABOUTME: DNS management patterns for Route53, Cloud DNS, and Azure DNS.
 # ABOUTME: Blocks zone deletion and record deletion operations.
-from guard.packs import register_tier1, register_tier2
+from functools import partial
+
+from guard import packs
+
+# Rules are registered under this pack however the module is imported
+register_tier1 = partial(packs.register_tier1, pack="dns")
+register_tier2 = partial(packs.register_tier2, pack="dns")
 
 # =============================================================================
 # AWS Route53
@@ -1,6 +1,12 @@
 # ABOUTME: Infrastructure-as-code patterns for Terraform, Pulumi, and CDK.
 # ABOUTME: Blocks destroy operations, allows plan/preview/synth.
-from guard.packs import register_tier2, register_allowlist
+from functools import partial
+
+from guard import packs
+
+# Rules are registered under this pack however the module is imported
+register_tier2 = partial(packs.register_tier2, pack="infra")
+register_allowlist = partial(packs.register_allowlist, pack="infra")
 
 # =============================================================================
 # Terraform
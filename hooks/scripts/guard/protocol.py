@@ -8,48 +8,56 @@ import sys
 def read_input() -> dict:
     """Read and parse JSON hook input from stdin. Returns empty dict on failure."""
     try:
-        return json.load(sys.stdin)
+        # Parse the raw bytes: json detects the encoding itself, which skips
+        # the locale-dependent text layer of sys.stdin
+        return json.loads(sys.stdin.buffer.read())
     except (json.JSONDecodeError, ValueError):
         return {}
 
 
-def deny(reason: str) -> None:
-    """Output a PreToolUse deny decision and exit."""
-    print(reason, file=sys.stderr)
-    output = {
+def _emit(output: dict) -> None:
+    """Write a hook response as a single line of JSON on stdout."""
+    sys.stdout.write(json.dumps(output) + "\n")
+
+
+def decision_output(decision: str, reason: str) -> dict:
+    """Build the PreToolUse response for a "deny" or "ask" decision."""
+    return {
         "hookSpecificOutput": {
             "hookEventName": "PreToolUse",
-            "permissionDecision": "deny",
+            "permissionDecision": decision,
             "permissionDecisionReason": reason,
         }
     }
-    print(json.dumps(output))
+
+
+def deny(reason: str) -> None:
+    """Output a PreToolUse deny decision and exit."""
+    print(reason, file=sys.stderr)
+    _emit(decision_output("deny", reason))
     sys.exit(0)
 
 
 def ask(reason: str) -> None:
     """Output a PreToolUse ask decision (user confirmation prompt) and exit."""
     print(reason, file=sys.stderr)
-    output = {
-        "hookSpecificOutput": {
-            "hookEventName": "PreToolUse",
-            "permissionDecision": "ask",
-            "permissionDecisionReason": reason,
-        }
-    }
-    print(json.dumps(output))
+    _emit(decision_output("ask", reason))
     sys.exit(0)
 
 
-def warn(context: str) -> None:
-    """Output a PostToolUse warning (additionalContext) and exit."""
-    output = {
+def warning_output(context: str) -> dict:
+    """Build the PostToolUse response carrying a warning as additionalContext."""
+    return {
         "hookSpecificOutput": {
             "hookEventName": "PostToolUse",
             "additionalContext": context,
         }
     }
-    print(json.dumps(output))
+
+
+def warn(context: str) -> None:
+    """Output a PostToolUse warning (additionalContext) and exit."""
+    _emit(warning_output(context))
     sys.exit(0)
 
 
@@ -0,0 +1,59 @@
+# ABOUTME: Regex helpers shared by the pattern registry and the credential scanner.
+# ABOUTME: Lazily compiled patterns and splitting of pattern sources into alternatives.
+import re
+
+# Characters that end the literal prefix of a pattern alternative
+METACHARS = set(".^$*+?{}[]()|\\")
+
+
+class DeferredPattern:
+    """A pattern that is only compiled on its own when first used.
+
+    Matching only needs pattern sources, which the registry joins into
+    combined tier alternations, so a hook run never pays for compiling each
+    rule separately. Any re.Pattern attribute other than .pattern (search,
+    match, flags, ...) compiles the pattern and is delegated to it.
+    """
+
+    __slots__ = ("pattern", "_compiled")
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self._compiled = None
+
+    def __getattr__(self, name):
+        if self._compiled is None:
+            self._compiled = re.compile(self.pattern)
+        return getattr(self._compiled, name)
+
+    def __repr__(self):
+        return f"re.compile({self.pattern!r})"
+
+
+def split_alternatives(source: str) -> list[str]:
+    """Split a pattern source on its top-level | operators."""
+    parts = []
+    depth = 0
+    in_class = False
+    start = 0
+    i = 0
+    while i < len(source):
+        ch = source[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if in_class:
+            if ch == ']':
+                in_class = False
+        elif ch == '[':
+            in_class = True
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == '|' and depth == 0:
+            parts.append(source[start:i])
+            start = i + 1
+        i += 1
+    parts.append(source[start:])
+    return parts
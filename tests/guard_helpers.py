@@ -0,0 +1,86 @@
+# ABOUTME: Shared helpers for tests that drive the hook scripts as subprocesses.
+# ABOUTME: Sends hook inputs to one `--serve` process per script and asserts on guard decisions.
+import atexit
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+GUARD_SCRIPT = os.path.join(
+    os.path.dirname(__file__), "..", "hooks", "scripts", "command-guard.py"
+)
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(GUARD_SCRIPT))
+
+# Tests of the guard package's internals import it in-process, as the hook
+# scripts do
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+# One `--serve` process per hook script answers every call for that hook, so
+# the interpreter start-up and imports are paid once per test run
+_servers = {}
+
+
+def _server(script: str) -> subprocess.Popen:
+    """Start the shared `script --serve` process on first use."""
+    server = _servers.get(script)
+    if server is None:
+        env = os.environ.copy()
+        env.pop("CLAUDE_GUARD_EXPLAIN", None)
+        env.pop("CLAUDE_GUARD_DAEMON", None)
+        server = subprocess.Popen(
+            [sys.executable, script, "--serve"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            env=env,
+        )
+        atexit.register(server.kill)
+        _servers[script] = server
+    return server
+
+
+def run_served(script: str, input_data: dict) -> dict | None:
+    """Send one hook input to the script's `--serve` process and return the
+    parsed response, or None when the hook had nothing to say."""
+    server = _server(script)
+    server.stdin.write(json.dumps(input_data) + "\n")
+    server.stdin.flush()
+    line = server.stdout.readline()
+    if not line:
+        raise RuntimeError(f"{os.path.basename(script)} --serve exited")
+    if line.strip():
+        return json.loads(line)
+    return None
+
+
+def run_guard(command: str) -> dict | None:
+    """Check a Bash tool input with the guard and return its parsed output."""
+    return run_served(GUARD_SCRIPT, {
+        "tool_name": "Bash",
+        "tool_input": {"command": command},
+    })
+
+
+def assert_denied(test_case: unittest.TestCase, command: str, msg: str = ""):
+    """Assert the command is denied by the guard."""
+    output = run_guard(command)
+    test_case.assertIsNotNone(output, f"Expected deny for: {command}. {msg}")
+    decision = output["hookSpecificOutput"]["permissionDecision"]
+    test_case.assertEqual(decision, "deny", f"Expected deny for: {command}. {msg}")
+
+
+def assert_asks(test_case: unittest.TestCase, command: str, msg: str = ""):
+    """Assert the command triggers a user confirmation prompt (Tier 2)."""
+    output = run_guard(command)
+    test_case.assertIsNotNone(output, f"Expected ask for: {command}. {msg}")
+    decision = output["hookSpecificOutput"]["permissionDecision"]
+    test_case.assertEqual(decision, "ask", f"Expected ask for: {command}. {msg}")
+
+
+def assert_allowed(test_case: unittest.TestCase, command: str, msg: str = ""):
+    """Assert the command is allowed by the guard."""
+    output = run_guard(command)
+    test_case.assertIsNone(output, f"Expected allow for: {command}. Got: {output}. {msg}")
@@ -8,6 +8,7 @@ on stderr without affecting the JSON protocol on stdout.
 import json
 import os
 import subprocess
+import sys
 import unittest
 
 GUARD_SCRIPT = os.path.join(
@@ -31,7 +32,7 @@ def run_guard(command: str, explain: bool = False) -> tuple[dict | None, str]:
         env.pop("CLAUDE_GUARD_EXPLAIN", None)
 
     result = subprocess.run(
-        ["python3", GUARD_SCRIPT],
+        [sys.executable, GUARD_SCRIPT],
         input=input_data,
         capture_output=True,
         text=True,
@@ -3,53 +3,34 @@
 # ABOUTME: Verifies blocking and allowlisting for each domain.
 """
 Tests new security packs by invoking command-guard.py as a subprocess,
-same as the existing test_command_guard.py tests.
+same as the existing test_command_guard.py tests. The pack loading and
+matching checks call guard.packs in-process.
 """
-import json
-import os
-import subprocess
+import importlib
+import re
+import sys
+import time
 import unittest
 
-GUARD_SCRIPT = os.path.join(
-    os.path.dirname(__file__), "..", "hooks", "scripts", "command-guard.py"
-)
+from guard_helpers import assert_allowed, assert_asks, assert_denied
 
+# guard_helpers has put hooks/scripts on sys.path
+import guard.packs as packs  # noqa: E402
 
-def run_guard(command: str) -> dict | None:
-    """Run command-guard.py with a Bash tool input and return parsed output."""
-    input_data = json.dumps({
-        "tool_name": "Bash",
-        "tool_input": {"command": command},
-    })
-    result = subprocess.run(
-        ["python3", GUARD_SCRIPT],
-        input=input_data,
-        capture_output=True,
-        text=True,
-    )
-    if result.stdout.strip():
-        return json.loads(result.stdout)
-    return None
-
-
-def assert_denied(tc, command, msg=""):
-    output = run_guard(command)
-    tc.assertIsNotNone(output, f"Expected deny for: {command}. {msg}")
-    decision = output["hookSpecificOutput"]["permissionDecision"]
-    tc.assertEqual(decision, "deny", f"Expected deny for: {command}. {msg}")
-
-
-def assert_asks(tc, command, msg=""):
-    """Assert the command triggers a user confirmation prompt (Tier 2)."""
-    output = run_guard(command)
-    tc.assertIsNotNone(output, f"Expected ask for: {command}. {msg}")
-    decision = output["hookSpecificOutput"]["permissionDecision"]
-    tc.assertEqual(decision, "ask", f"Expected ask for: {command}. {msg}")
-
-
-def assert_allowed(tc, command, msg=""):
-    output = run_guard(command)
-    tc.assertIsNone(output, f"Expected allow for: {command}. Got: {output}. {msg}")
+# Commands whose combined-alternation match is compared with a rule-by-rule scan
+COMBINED_COMMANDS = [
+    "git push --force origin main && rm -rf /",
+    "rm -rf build/ ; DROP TABLE users",
+    "psql -c 'drop database prod'",
+    "echo ok | TRUNCATE orders",
+    "docker system prune -a && kubectl delete namespace prod",
+    "aws s3 rb s3://bucket --force; terraform destroy",
+    "gcloud projects delete my-project",
+    "gh repo delete owner/repo --yes",
+    "git push --force-with-lease",
+    "rm -rf /tmp/build",
+    "ls -la",
+]
 
 
 # =============================================================================
@@ -236,5 +217,137 @@ class TestDNS(unittest.TestCase):
         assert_allowed(self, "az network dns zone list")
 
 
+# =============================================================================
+# On-demand pack loading
+# =============================================================================
+
+def _sources() -> list[str]:
+    """Pattern sources of every rule in the tier lists."""
+    sources = [rule[0].pattern for rule in packs.tier1_rules() + packs.tier2_rules()]
+    return sources + [pattern.pattern for pattern in packs.allowlist_rules()]
+
+
+class TestPackLoading(unittest.TestCase):
+    """Optional packs are loaded whenever a command could match their rules."""
+
+    def test_every_rule_requires_a_pack_keyword(self):
+        packs.load_all()
+        for name, keywords in packs._PACKS:
+            if not keywords:
+                continue
+            tier1, tier2, allowlist = packs._pack_rules[name]
+            patterns = [rule[0] for rule in tier1 + tier2] + allowlist
+            for pattern in patterns:
+                with self.subTest(pack=name, pattern=pattern.pattern):
+                    literals = packs._triggers(pattern.pattern)
+                    self.assertIsNotNone(literals, "no literal every match starts with")
+                    for literal in literals:
+                        self.assertTrue(
+                            any(k in literal for k in keywords),
+                            f"{literal!r} contains none of {keywords}",
+                        )
+
+    def test_direct_pack_import_registers_once(self):
+        packs.load_all()
+        expected = sorted(_sources())
+        # Forget the pack, as if it had never been loaded, then import it the
+        # way a caller outside _load() would
+        sys.modules.pop("guard.packs.cloud", None)
+        packs._loaded.discard("cloud")
+        del packs._pack_rules["cloud"]
+        importlib.import_module("guard.packs.cloud")
+        packs.load_all()
+        self.assertEqual(sorted(_sources()), expected)
+        self.assertNotIn(None, packs._pack_rules)
+
+    def test_pack_command_after_core_command(self):
+        assert_asks(self, "cd infra && terraform destroy")
+
+    def test_pack_command_after_separator(self):
+        assert_denied(self, "echo done; gh repo delete owner/repo --yes")
+
+    def test_pack_command_in_subshell(self):
+        assert_asks(self, "(aws s3 rb s3://bucket --force)")
+
+
+def _repetitive_command(pattern, size: int) -> str:
+    """Build a command of about `size` characters by repeating the words of a
+    pattern's own source, the input that makes nested `.*` rules backtrack."""
+    source = re.sub(r"\\[sSdDwWbB]|\(\?[a-zA-Z]+\)", " ", pattern.pattern)
+    unit = " ".join(re.findall(r"-{0,2}[A-Za-z][A-Za-z0-9_=-]*", source)) + " "
+    return unit * (size // len(unit) + 1)
+
+
+def _search_time(pattern, command: str) -> float:
+    """Best of several timed searches, so one scheduler hiccup does not count."""
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        pattern.search(command)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _growth(pattern, size: int) -> float:
+    """How many times longer a search takes on a command four times as long."""
+    small = _search_time(pattern, _repetitive_command(pattern, size))
+    large = _search_time(pattern, _repetitive_command(pattern, 4 * size))
+    return large / max(small, 1e-9)
+
+
+# A quadratic search takes 16 times as long on 4 times the input, a cubic one
+# 64 times; anything past the midpoint grows worse than quadratically
+MAX_GROWTH = 32
+
+
+class TestBacktracking(unittest.TestCase):
+    """No rule takes worse than quadratic time on long repetitive commands."""
+
+    @classmethod
+    def setUpClass(cls):
+        packs.load_all()
+
+    def test_growth_check_catches_nested_wildcards(self):
+        self.assertGreater(_growth(re.compile(r"aws.*s3.*rm.*--force/"), 500), MAX_GROWTH)
+
+    def test_no_rule_backtracks_catastrophically(self):
+        patterns = ([rule[0] for rule in packs.tier1_rules()]
+                    + [rule[0] for rule in packs.tier2_rules()]
+                    + list(packs.allowlist_rules()))
+        for pattern in patterns:
+            with self.subTest(pattern=pattern.pattern):
+                self.assertLessEqual(_growth(pattern, 500), MAX_GROWTH)
+
+
+class TestCombinedMatching(unittest.TestCase):
+    """One search of a tier's combined alternation picks the same rule as
+    searching each rule in turn: the earliest match, then the first registered."""
+
+    def test_combined_match_agrees_with_each_rule(self):
+        packs.load_all()
+        tiers = (("tier1", packs.tier1_rules(), lambda rule: rule[0]),
+                 ("tier2", packs.tier2_rules(), lambda rule: rule[0]),
+                 ("allowlist", packs.allowlist_rules(), lambda rule: rule))
+        for command in COMBINED_COMMANDS:
+            for name, rules, pattern_of in tiers:
+                with self.subTest(tier=name, command=command):
+                    expected = None
+                    best = None
+                    for rule in rules:
+                        m = pattern_of(rule).search(command)
+                        if m and (best is None or m.start() < best):
+                            expected, best = rule, m.start()
+                    found = packs._first_match(
+                        name, rules, map(pattern_of, rules), [command]
+                    )
+                    self.assertIs(found, expected)
+
+    def test_case_insensitive_rule_stays_scoped(self):
+        """A rule's (?i) must not make neighbouring case-sensitive rules
+        case-insensitive once they are joined."""
+        assert_allowed(self, "GIT PUSH --FORCE origin main")
+        assert_denied(self, "psql -c 'Drop Database prod'")
+
+
 if __name__ == "__main__":
     unittest.main()